@@ -3,19 +3,187 @@
 Analysis of church coverage in Istanbul
 """
 
-from istanbul_churches_map import IstanbulChurchesMapper
+import heapq
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from functools import lru_cache
 
-def analyze_church_coverage():
-    """Analyze the church coverage across Istanbul."""
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Area queries fall back to _SortedLatIndex
+
+from istanbul_churches_map import IstanbulChurchesMapper, normalize_denomination
+
+# Keywords that mark a church as notable in the summary
+NOTABLE_RE = re.compile(r'hagia|sophia|cathedral|patriarchate|saint|holy', re.IGNORECASE)
+
+@lru_cache(maxsize=None)
+def _normalize(denomination):
+    """Return the label a denomination is counted under in the distribution summary."""
+    family = normalize_denomination(denomination)
+    if family:
+        return family
+    if denomination.lower() == 'christian':
+        return 'General Christian'
+    return denomination
+
+def _hilbert(x, y):
+    """Hilbert curve index of 16-bit grid coordinates (vectorized port of flatbush's hilbert())."""
+    a = x ^ y
+    b = 0xFFFF ^ a
+    c = 0xFFFF ^ (x | y)
+    d = x & (y ^ 0xFFFF)
+
+    A = a | (b >> 1)
+    B = (a >> 1) ^ a
+    C = ((c >> 1) ^ (b & (d >> 1))) ^ c
+    D = ((a & (c >> 1)) ^ (d >> 1)) ^ d
+
+    a, b, c, d = A, B, C, D
+    A = (a & (a >> 2)) ^ (b & (b >> 2))
+    B = (a & (b >> 2)) ^ (b & ((a ^ b) >> 2))
+    C = C ^ ((a & (c >> 2)) ^ (b & (d >> 2)))
+    D = D ^ ((b & (c >> 2)) ^ ((a ^ b) & (d >> 2)))
+
+    a, b, c, d = A, B, C, D
+    A = (a & (a >> 4)) ^ (b & (b >> 4))
+    B = (a & (b >> 4)) ^ (b & ((a ^ b) >> 4))
+    C = C ^ ((a & (c >> 4)) ^ (b & (d >> 4)))
+    D = D ^ ((b & (c >> 4)) ^ ((a ^ b) & (d >> 4)))
+
+    a, b, c, d = A, B, C, D
+    C = C ^ ((a & (c >> 8)) ^ (b & (d >> 8)))
+    D = D ^ ((b & (c >> 8)) ^ ((a ^ b) & (d >> 8)))
+
+    a = C ^ (C >> 1)
+    b = D ^ (D >> 1)
+
+    i0 = x ^ y
+    i1 = b | (0xFFFF ^ (i0 | a))
+
+    i0 = (i0 | (i0 << 8)) & 0x00FF00FF
+    i0 = (i0 | (i0 << 4)) & 0x0F0F0F0F
+    i0 = (i0 | (i0 << 2)) & 0x33333333
+    i0 = (i0 | (i0 << 1)) & 0x55555555
+
+    i1 = (i1 | (i1 << 8)) & 0x00FF00FF
+    i1 = (i1 | (i1 << 4)) & 0x0F0F0F0F
+    i1 = (i1 | (i1 << 2)) & 0x33333333
+    i1 = (i1 | (i1 << 1)) & 0x55555555
+
+    return (i1 << 1) | i0
+
+class _FlatbushIndex:
+    """Static packed Hilbert R-tree over points (same layout as mourner/flatbush).
+
+    Leaves are the points in Hilbert order; each level above stores the
+    bounding boxes of ``node_size`` consecutive entries of the level below,
+    so a range query only descends into nodes that intersect the query box.
+    """
+
+    def __init__(self, min_lat, max_lat, min_lon, max_lon, indices, level_bounds, num_items, node_size):
+        self.min_lat = min_lat
+        self.max_lat = max_lat
+        self.min_lon = min_lon
+        self.max_lon = max_lon
+        self.indices = indices
+        self.level_bounds = level_bounds
+        self.num_items = num_items
+        self.node_size = node_size
+
+    def range(self, south, west, north, east):
+        """Return the original indices of all points inside the bounding box."""
+        found = []
+        stack = [len(self.indices) - 1] if self.num_items else []
+        while stack:
+            node = stack.pop()
+            end = min(node + self.node_size, self.level_bounds[bisect_right(self.level_bounds, node)])
+            hits = node + np.flatnonzero(
+                (self.min_lat[node:end] <= north) & (self.max_lat[node:end] >= south) &
+                (self.min_lon[node:end] <= east) & (self.max_lon[node:end] >= west)
+            )
+            if node < self.num_items:
+                found.append(self.indices[hits])
+            else:
+                stack.extend(self.indices[hits].tolist())
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int32)
+
+def _build_flatbush(lat, lon, node_size=16):
+    """Pack the points into a :class:`_FlatbushIndex`, building levels bottom-up."""
+    num_items = len(lat)
+    
+    # Sort points along a Hilbert curve over a 16-bit grid spanning their extent
+    def to_grid(values):
+        extent = values.max() - values.min()
+        return ((values - values.min()) / (extent or 1) * 0xFFFF).astype(np.uint32)
+    
+    if num_items:
+        order = np.argsort(_hilbert(to_grid(lon), to_grid(lat)), kind='stable')
+    else:
+        order = np.empty(0, dtype=np.intp)
+    
+    levels = [(lat[order], lat[order], lon[order], lon[order], order.astype(np.int32))]
+    level_bounds = [num_items]
+    child_offset = 0
+    while len(levels[-1][0]) > 1:
+        min_lat, max_lat, min_lon, max_lon, _ = levels[-1]
+        starts = np.arange(0, len(min_lat), node_size)
+        levels.append((
+            np.minimum.reduceat(min_lat, starts),
+            np.maximum.reduceat(max_lat, starts),
+            np.minimum.reduceat(min_lon, starts),
+            np.maximum.reduceat(max_lon, starts),
+            (starts + child_offset).astype(np.int32),
+        ))
+        child_offset = level_bounds[-1]
+        level_bounds.append(level_bounds[-1] + len(starts))
+    
+    columns = [np.concatenate(column) for column in zip(*levels)]
+    return _FlatbushIndex(*columns, level_bounds, num_items, node_size)
+
+class _SortedLatIndex:
+    """Points sorted by latitude; a range query bisects the latitude band and filters longitude.
+    
+    Pure-Python stand-in for :class:`_FlatbushIndex` when NumPy is not installed.
+    """
+    
+    def __init__(self, lats, lons):
+        self.order = sorted(range(len(lats)), key=lats.__getitem__)
+        self.lats = array('d', (lats[i] for i in self.order))
+        self.lons = array('d', (lons[i] for i in self.order))
+    
+    def range(self, south, west, north, east):
+        """Return the original indices of all points inside the bounding box."""
+        lo = bisect_left(self.lats, south)
+        hi = bisect_right(self.lats, north)
+        return [self.order[i] for i in range(lo, hi) if west <= self.lons[i] <= east]
+
+def analyze_church_coverage(refresh=False):
+    """Analyze the church coverage across Istanbul.
+    
+    With refresh=True the cached Overpass responses are ignored and refetched.
+    """
     print("🗺️ Istanbul Churches Coverage Analysis")
     print("=" * 50)
     
-    mapper = IstanbulChurchesMapper()
+    mapper = IstanbulChurchesMapper(refresh=refresh)
     churches = mapper.fetch_churches_from_overpass()
     
     print(f"Total churches found: {len(churches)}")
     print()
     
+    # Index the fetched coordinate columns for the bounding-box queries below
+    names = [church.name for church in churches]
+    if np is not None:
+        lat = np.frombuffer(mapper.lats, dtype=np.float64)
+        lon = np.frombuffer(mapper.lons, dtype=np.float64)
+        index = _build_flatbush(lat, lon)
+    else:
+        index = _SortedLatIndex(mapper.lats, mapper.lons)
+    
     # Analyze by area/district
     print("📍 Geographic Distribution:")
     
@@ -33,42 +201,21 @@ def analyze_church_coverage():
     }
     
     for area_name, (south, west, north, east) in areas.items():
-        count = 0
-        area_churches = []
-        
-        for church in churches:
-            lat, lon = church['coordinates']
-            if south <= lat <= north and west <= lon <= east:
-                count += 1
-                area_churches.append(church['name'])
+        idx = sorted(index.range(south, west, north, east))
+        count = len(idx)
         
         print(f"  {area_name:20}: {count:3d} churches")
         if count > 0 and count <= 5:  # Show names for smaller areas
-            for name in area_churches[:3]:
-                print(f"    - {name}")
-            if len(area_churches) > 3:
-                print(f"    ... and {len(area_churches)-3} more")
+            for i in idx[:3]:
+                print(f"    - {names[i]}")
+            if count > 3:
+                print(f"    ... and {count-3} more")
     
     # Analyze by denomination
     print("\n⛪ Denomination Distribution:")
-    denominations = {}
-    for church in churches:
-        denom = church.get('denomination', 'Unknown')
-        # Normalize denomination names
-        if 'orthodox' in denom.lower():
-            denom = 'Orthodox'
-        elif 'catholic' in denom.lower():
-            denom = 'Catholic'
-        elif 'armenian' in denom.lower():
-            denom = 'Armenian Orthodox'
-        elif 'protestant' in denom.lower():
-            denom = 'Protestant'
-        elif denom.lower() == 'christian':
-            denom = 'General Christian'
-        
-        denominations[denom] = denominations.get(denom, 0) + 1
+    denominations = Counter(_normalize(church.denomination) for church in churches)
     
-    for denom, count in sorted(denominations.items(), key=lambda x: x[1], reverse=True):
+    for denom, count in denominations.most_common():
         print(f"  {denom:20}: {count:3d} churches")
     
     # Coverage statistics
@@ -80,13 +227,9 @@ def analyze_church_coverage():
     
     # Find interesting churches
     print(f"\n🏛️ Notable Churches Found:")
-    notable = []
-    for church in churches:
-        name = church['name'].lower()
-        if any(keyword in name for keyword in ['hagia', 'sophia', 'cathedral', 'patriarchate', 'saint', 'holy']):
-            notable.append(church['name'])
+    notable = [church.name for church in churches if NOTABLE_RE.search(church.name)]
     
-    for name in sorted(notable)[:10]:  # Show first 10
+    for name in heapq.nsmallest(10, notable):  # Show first 10
         print(f"  - {name}")
     if len(notable) > 10:
         print(f"  ... and {len(notable)-10} more notable churches")
@@ -6,21 +6,317 @@ A script to create an interactive map showing all churches in Istanbul using Fol
         return [treetMap data.
 """
 
-import folium
+import hashlib
+import orjson
 import requests
-import json
+import os
+import sys
+import threading
 import time
-from typing import List, Dict, Tuple
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, List, Dict, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    import folium
+
+OVERPASS_URL = "http://overpass-api.de/api/interpreter"
+
+# One session for all Overpass requests so they share kept-alive connections.
+# trust_env=False bypasses any configured proxy for the OpenStreetMap API.
+_SESSION = requests.Session()
+_SESSION.trust_env = False
+# The public Overpass instance gives each IP only a couple of query slots;
+# more requests than that at once are answered with 429 Too Many Requests
+OVERPASS_MAX_CONCURRENT = 2
+_OVERPASS_SLOTS = threading.BoundedSemaphore(OVERPASS_MAX_CONCURRENT)
+# All requests go to one host, at most OVERPASS_MAX_CONCURRENT at a time
+_SESSION.mount('http://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=OVERPASS_MAX_CONCURRENT))
+
+# One lock per cache file, so concurrent callers of the same query share a
+# single request; _FETCHED holds the cache files written by this process
+_FETCH_LOCKS: Dict[Path, threading.Lock] = {}
+_FETCH_LOCKS_GUARD = threading.Lock()
+_FETCHED: Set[Path] = set()
+
+# Overpass responses are reused for a day; OSM church data rarely changes faster
+CACHE_TTL = 24 * 60 * 60
+CACHE_DIR = Path(__file__).parent / '.cache'
+
+# Much larger bounding box covering full Istanbul metropolitan area:
+# - Includes Princes' Islands (southeast)
+# - Northern districts (Sarıyer, Beykoz, etc.)
+# - Western suburbs (Avcılar, Beylikdüzü, etc.)
+# - Eastern Asian side (Pendik, Tuzla, etc.)
+# Coordinates: [south, west, north, east]
+# nwr matches nodes, ways and relations in one clause; "out tags center"
+# returns only tags and a single point, not the member node lists
+CHURCHES_QUERY = """
+[out:json][timeout:25];
+(
+  nwr["amenity"="place_of_worship"]["religion"="christian"](40.8,28.4,41.4,29.8);
+  nwr["historic"="church"](40.8,28.4,41.4,29.8);
+  nwr["building"="church"](40.8,28.4,41.4,29.8);
+);
+out tags center;
+"""
+
+# Specific query for Princes' Islands (Adalar)
+# Büyükada, Heybeliada, Burgazada, Kınalıada coordinates
+ISLANDS_QUERY = """
+[out:json][timeout:10];
+(
+  nwr["amenity"="place_of_worship"]["religion"="christian"](40.84,29.06,40.91,29.15);
+  nwr["historic"="church"](40.84,29.06,40.91,29.15);
+);
+out tags center;
+"""
+
+@dataclass(slots=True)
+class Church:
+    """A single church record, from OpenStreetMap or the fallback list."""
+    name: str
+    lat: float
+    lon: float
+    name_en: str = ''
+    denomination: str = 'Christian'
+    religion: str = 'christian'
+    historic: str = ''
+    building: str = ''
+    amenity: str = ''
+    osm_id: Optional[int] = None
+    osm_type: str = ''
+    description: str = ''
+    area: str = ''
+
+# Marker colors for each denomination family
+DENOMINATION_COLORS = {
+    'Orthodox': 'red',
+    'Catholic': 'blue',
+    'Armenian Orthodox': 'purple',
+    'Protestant': 'green',
+    'Christian': 'orange',
+    'Unknown': 'gray'
+}
+
+# Substrings identifying a denomination family, checked in priority order
+DENOMINATION_KEYWORDS = (
+    ('orthodox', 'Orthodox'),
+    ('catholic', 'Catholic'),
+    ('armenian', 'Armenian Orthodox'),
+    ('protestant', 'Protestant'),
+)
+
+@lru_cache(maxsize=None)
+def normalize_denomination(denomination: str) -> Optional[str]:
+    """Map a denomination tag to its family name, or None if it is not recognized.
+    
+    Only a handful of distinct tags occur, so results are memoized per string.
+    """
+    lowered = denomination.lower()
+    for keyword, family in DENOMINATION_KEYWORDS:
+        if keyword in lowered:
+            return family
+    return None
+
+# Marker popup skeleton; optional rows are pre-rendered by _popup_html
+_POPUP_TMPL = """
+<div style="width: 280px;">
+    <h4 style="margin-bottom: 10px; color: #333;">⛪ {name}</h4>
+    {name_en_block}
+    <p><strong>Denomination:</strong> <span style="color: {color}; font-weight: bold;">●</span> {denomination}</p>
+    {type_block}
+    {description_block}
+    <p><strong>Coordinates:</strong> {lat:.4f}, {lon:.4f}</p>
+    {osm_block}
+    <hr style="margin: 10px 0;">
+    <small style="color: #666;">
+        <strong>Legend:</strong><br>
+        <span style="color: red;">●</span> Orthodox &nbsp;
+        <span style="color: blue;">●</span> Catholic &nbsp;
+        <span style="color: purple;">●</span> Armenian<br>
+        <span style="color: green;">●</span> Protestant &nbsp;
+        <span style="color: orange;">●</span> Christian
+    </small>
+</div>
+"""
+
+# Leaflet callback turning one marker record into a styled circle marker
+_MARKER_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 6,
+        color: row[2],
+        fill: true,
+        fillColor: row[2],
+        fillOpacity: 0.8,
+        weight: 2
+    });
+    marker.bindPopup(row[3], {maxWidth: 320});
+    marker.bindTooltip(row[4]);
+    return marker;
+}
+"""
+
+def _popup_html(church: Church, color: str, denomination: str) -> str:
+    """Render the popup HTML for one church marker."""
+    return _POPUP_TMPL.format_map({
+        'name': church.name,
+        'name_en_block': f"<p><strong>English Name:</strong> {church.name_en}</p>" if church.name_en else "",
+        'color': color,
+        'denomination': denomination,
+        'type_block': f"<p><strong>Type:</strong> {(church.historic or church.building).title()}</p>" if church.historic or church.building else "",
+        'description_block': f"<p><strong>Description:</strong> {church.description}</p>" if church.description else "",
+        'lat': church.lat,
+        'lon': church.lon,
+        'osm_block': f"<p><strong>OSM ID:</strong> {church.osm_type}{church.osm_id}</p>" if church.osm_id else "",
+    })
+
+def _build_legend(denomination_colors: Dict[str, str]) -> str:
+    """Build the HTML legend box listing each denomination color."""
+    legend_html = '''
+    <div style="position: fixed; 
+                bottom: 50px; left: 50px; width: 200px; height: auto; 
+                background-color: white; border:2px solid grey; z-index:9999; 
+                font-size:14px; padding: 10px">
+    <h4 style="margin-top: 0;">Church Denominations</h4>
+    '''
+    
+    for denomination, color in denomination_colors.items():
+        if denomination != 'Unknown':  # Skip unknown in legend
+            legend_html += f'''
+            <p style="margin: 5px 0;">
+                <i class="fa fa-circle" style="color:{color}; margin-right: 5px;"></i>
+                {denomination}
+            </p>
+            '''
+    
+    return legend_html + '</div>'
+
+# The legend only depends on the fixed colors, so build it once at import
+_LEGEND_HTML = _build_legend(DENOMINATION_COLORS)
+
+def _atomic_write(path: Path, write_fn: Callable[[Path], None]) -> None:
+    """Have write_fn write a temp file next to path, then swap it in with os.replace.
+    
+    Readers see either the old file or the complete new one. The temp name is
+    unique per process and thread, and the temp file is removed if writing fails.
+    """
+    tmp_path = path.with_suffix(f'{path.suffix}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        write_fn(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+def _stream_save(folium_map: 'folium.Map', filepath: Path) -> None:
+    """Write the map HTML in chunks instead of rendering it to one big string."""
+    root = folium_map.get_root()
+    
+    # As in Figure.render(): children first register their header/html/script parts
+    for child in root._children.values():
+        child.render()
+    
+    def write(tmp_path: Path) -> None:
+        with open(tmp_path, 'wb') as f:
+            root._template.stream(this=root, kwargs={}).dump(f, encoding='utf-8')
+    
+    _atomic_write(filepath, write)
+
+def _coord_key(lat: float, lon: float) -> int:
+    """Pack a location rounded to 1e-6 degrees into one int for duplicate checks."""
+    return (round(lat * 1e6) << 32) | (round(lon * 1e6) & 0xFFFFFFFF)
+
+def _element_location(element: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """Point location of an Overpass element (nodes carry lat/lon, ways and relations a center)."""
+    if 'lat' in element:
+        return element['lat'], element['lon']
+    if 'center' in element:
+        return element['center']['lat'], element['center']['lon']
+    return None
+
+def _make_church(element: Dict[str, Any], lat: float, lon: float, name_prefix: str, area: str = '') -> Church:
+    """Build a Church from an Overpass element's tags."""
+    tags: Dict[str, str] = element.get('tags', {})
+    
+    # Tag values repeat across thousands of elements; intern them
+    # so each distinct value is stored once
+    return Church(
+        name=tags.get('name', f'{name_prefix} {element["id"]}'),
+        name_en=tags.get('name:en', ''),
+        denomination=sys.intern(tags.get('denomination', 'Christian')),
+        religion=sys.intern(tags.get('religion', 'christian')),
+        historic=sys.intern(tags.get('historic', '')),
+        building=sys.intern(tags.get('building', '')),
+        amenity=sys.intern(tags.get('amenity', '')),
+        lat=lat,
+        lon=lon,
+        osm_id=element['id'],
+        osm_type=sys.intern(element['type']),
+        area=area
+    )
+
+def overpass_cache_path(query: str) -> Path:
+    """Cache file for an Overpass query, keyed by a hash of the query text."""
+    key = hashlib.sha1(query.encode('utf-8')).hexdigest()
+    return CACHE_DIR / f'overpass_{key}.json'
+
+def fetch_overpass(query: str, timeout: int, refresh: bool = False, ttl: int = CACHE_TTL) -> bytes:
+    """Return the raw Overpass response for query, served from the disk cache while fresh.
+    
+    With refresh=True the cache is bypassed and overwritten with a new response,
+    once per process: later callers of the same query reuse that response.
+    """
+    path = overpass_cache_path(query)
+    with _FETCH_LOCKS_GUARD:
+        lock = _FETCH_LOCKS.setdefault(path, threading.Lock())
+    
+    with lock:
+        # Another caller already fetched this query, possibly while we waited
+        if path in _FETCHED:
+            return path.read_bytes()
+        if not refresh:
+            try:
+                if time.time() - path.stat().st_mtime < ttl:
+                    return path.read_bytes()
+            except OSError:
+                pass  # No cache yet
+        
+        with _OVERPASS_SLOTS:
+            response = _SESSION.get(OVERPASS_URL, params={'data': query}, timeout=timeout)
+        response.raise_for_status()
+        orjson.loads(response.content)  # Never cache a payload we cannot parse
+        
+        # Write atomically so an interrupted run never leaves a truncated cache;
+        # the lock only covers this process, but another script run fetching the
+        # same query writes its own temp file
+        CACHE_DIR.mkdir(exist_ok=True)
+        _atomic_write(path, lambda tmp_path: tmp_path.write_bytes(response.content))
+        _FETCHED.add(path)
+    return response.content
 
 class IstanbulChurchesMapper:
-    def __init__(self):
+    def __init__(self, refresh: bool = False):
         # Istanbul coordinates (center of the city)
         self.istanbul_center = [41.0082, 28.9784]
         self.map = None
         self.churches_data = []
+        # Bypass the Overpass response cache
+        self.refresh = refresh
+        # Coordinates of the last fetched churches as parallel float64 columns
+        self.lats = array('d')
+        self.lons = array('d')
         
-    def create_base_map(self) -> folium.Map:
+    def create_base_map(self) -> 'folium.Map':
         """Create the base Folium map centered on Istanbul."""
+        # folium is only needed for map output; importing it lazily keeps
+        # fetch-only callers like analyze_coverage.py fast to start
+        import folium
+        
         print("Creating base map centered on Istanbul...")
         
         # Create map with default OpenStreetMap tiles (most informative)
@@ -40,34 +336,12 @@ class IstanbulChurchesMapper:
         
         return self.map
     
-    def fetch_churches_from_overpass(self) -> List[Dict]:
+    def fetch_churches_from_overpass(self) -> List[Church]:
         """Fetch church data from OpenStreetMap using Overpass API."""
         print("Fetching church data from OpenStreetMap...")
         
         # Expanded query to cover ALL of Istanbul including Princes' Islands
         try:
-            overpass_url = "http://overpass-api.de/api/interpreter"
-            
-            # Much larger bounding box covering full Istanbul metropolitan area:
-            # - Includes Princes' Islands (southeast)
-            # - Northern districts (Sarıyer, Beykoz, etc.)
-            # - Western suburbs (Avcılar, Beylikdüzü, etc.) 
-            # - Eastern Asian side (Pendik, Tuzla, etc.)
-            # Coordinates: [south, west, north, east]
-            overpass_query = """
-            [out:json][timeout:25];
-            (
-              node["amenity"="place_of_worship"]["religion"="christian"](40.8,28.4,41.4,29.8);
-              way["amenity"="place_of_worship"]["religion"="christian"](40.8,28.4,41.4,29.8);
-              relation["amenity"="place_of_worship"]["religion"="christian"](40.8,28.4,41.4,29.8);
-              node["historic"="church"](40.8,28.4,41.4,29.8);
-              way["historic"="church"](40.8,28.4,41.4,29.8);
-              node["building"="church"](40.8,28.4,41.4,29.8);
-              way["building"="church"](40.8,28.4,41.4,29.8);
-            );
-            out center;
-            """
-            
             print(f"Querying expanded area: South=40.8, West=28.4, North=41.4, East=29.8")
             print("This includes:")
             print("  - Princes' Islands (Büyükada, Heybeliada, etc.)")
@@ -76,120 +350,70 @@ class IstanbulChurchesMapper:
             print("  - Eastern Asian side (Pendik, Tuzla)")
             print("  - All central Istanbul districts")
             
-            # Bypass proxy for OpenStreetMap API
-            proxies = {
-                'http': '',
-                'https': ''
-            }
-            response = requests.get(overpass_url, params={'data': overpass_query}, timeout=30, proxies=proxies)
-            response.raise_for_status()
-            data = response.json()
+            # The Princes' Islands query runs alongside the main one, so the
+            # total wait is the slower request rather than both in sequence
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                islands_future = executor.submit(self.fetch_princes_islands_churches)
+                data = orjson.loads(fetch_overpass(CHURCHES_QUERY, timeout=30, refresh=self.refresh))
+                island_churches = islands_future.result()
             
             churches = []
+            lats, lons = array('d'), array('d')
             seen_coordinates = set()  # To avoid duplicates
             
             for element in data['elements']:
-                # Extract coordinates
-                if element['type'] == 'node':
-                    lat, lon = element['lat'], element['lon']
-                elif 'center' in element:
-                    lat, lon = element['center']['lat'], element['center']['lon']
-                else:
+                location = _element_location(element)
+                if location is None:
                     continue
+                lat, lon = location
                 
                 # Skip duplicates (same location)
-                coord_key = f"{lat:.6f},{lon:.6f}"
+                coord_key = _coord_key(lat, lon)
                 if coord_key in seen_coordinates:
                     continue
                 seen_coordinates.add(coord_key)
-                    
-                tags = element.get('tags', {})
                 
-                church_info = {
-                    'name': tags.get('name', f'Church {element["id"]}'),
-                    'name_en': tags.get('name:en', ''),
-                    'denomination': tags.get('denomination', 'Christian'),
-                    'religion': tags.get('religion', 'christian'),
-                    'historic': tags.get('historic', ''),
-                    'building': tags.get('building', ''),
-                    'amenity': tags.get('amenity', ''),
-                    'coordinates': [lat, lon],
-                    'osm_id': element['id'],
-                    'osm_type': element['type']
-                }
+                church_info = _make_church(element, lat, lon, 'Church')
                 churches.append(church_info)
+                lats.append(lat)
+                lons.append(lon)
             
             print(f"Found {len(churches)} churches in expanded Istanbul area")
             
-            # If we got less than expected, try specific island queries
-            if len(churches) < 200:
-                print("Trying additional query for Princes' Islands...")
-                island_churches = self.fetch_princes_islands_churches()
-                
-                # Add island churches without duplicates
-                for island_church in island_churches:
-                    coord_key = f"{island_church['coordinates'][0]:.6f},{island_church['coordinates'][1]:.6f}"
-                    if coord_key not in seen_coordinates:
-                        churches.append(island_church)
-                        seen_coordinates.add(coord_key)
-                
-                print(f"Total with islands: {len(churches)} churches")
+            # Add island churches without duplicates
+            for island_church in island_churches:
+                coord_key = _coord_key(island_church.lat, island_church.lon)
+                if coord_key not in seen_coordinates:
+                    churches.append(island_church)
+                    lats.append(island_church.lat)
+                    lons.append(island_church.lon)
+                    seen_coordinates.add(coord_key)
+            
+            print(f"Total with islands: {len(churches)} churches")
             
+            self.lats, self.lons = lats, lons
             return churches
             
         except Exception as e:
             print(f"Error fetching data from Overpass API: {e}")
             print("Using fallback church data")
-            return self.get_fallback_churches()
+            churches = self.get_fallback_churches()
+            self.lats = array('d', (church.lat for church in churches))
+            self.lons = array('d', (church.lon for church in churches))
+            return churches
     
-    def fetch_princes_islands_churches(self) -> List[Dict]:
+    def fetch_princes_islands_churches(self) -> List[Church]:
         """Fetch churches specifically from Princes' Islands."""
         try:
-            # Specific query for Princes' Islands (Adalar)
-            # Büyükada, Heybeliada, Burgazada, Kınalıada coordinates
-            overpass_query = """
-            [out:json][timeout:10];
-            (
-              node["amenity"="place_of_worship"]["religion"="christian"](40.84,29.06,40.91,29.15);
-              way["amenity"="place_of_worship"]["religion"="christian"](40.84,29.06,40.91,29.15);
-              node["historic"="church"](40.84,29.06,40.91,29.15);
-              way["historic"="church"](40.84,29.06,40.91,29.15);
-            );
-            out center;
-            """
-            
-            response = requests.get(
-                "http://overpass-api.de/api/interpreter", 
-                params={'data': overpass_query}, 
-                timeout=15
-            )
-            response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(fetch_overpass(ISLANDS_QUERY, timeout=15, refresh=self.refresh))
             
             island_churches = []
             for element in data['elements']:
-                if element['type'] == 'node':
-                    lat, lon = element['lat'], element['lon']
-                elif 'center' in element:
-                    lat, lon = element['center']['lat'], element['center']['lon']
-                else:
+                location = _element_location(element)
+                if location is None:
                     continue
-                    
-                tags = element.get('tags', {})
                 
-                church_info = {
-                    'name': tags.get('name', f'Island Church {element["id"]}'),
-                    'name_en': tags.get('name:en', ''),
-                    'denomination': tags.get('denomination', 'Christian'),
-                    'religion': tags.get('religion', 'christian'),
-                    'historic': tags.get('historic', ''),
-                    'building': tags.get('building', ''),
-                    'amenity': tags.get('amenity', ''),
-                    'coordinates': [lat, lon],
-                    'osm_id': element['id'],
-                    'osm_type': element['type'],
-                    'area': 'Princes Islands'
-                }
+                church_info = _make_church(element, *location, 'Island Church', area='Princes Islands')
                 island_churches.append(church_info)
             
             print(f"  Found {len(island_churches)} churches in Princes' Islands")
@@ -199,319 +423,259 @@ class IstanbulChurchesMapper:
             print(f"  Error fetching Princes' Islands churches: {e}")
             return []
     
-    def get_fallback_churches(self) -> List[Dict]:
+    def get_fallback_churches(self) -> List[Church]:
         """Fallback data with famous churches in Istanbul if API fails."""
         print("Using expanded fallback church data...")
         
         return [
             # Historic and Major Churches
-            {
-                'name': 'Hagia Sophia',
-                'name_en': 'Hagia Sophia',
-                'denomination': 'Orthodox (Historic)',
-                'religion': 'christian',
-                'historic': 'church',
-                'coordinates': [41.0086, 28.9802],
-                'description': 'Historic Byzantine cathedral, later Ottoman mosque, now museum/mosque'
-            },
-            {
-                'name': 'Chora Church (Kariye Museum)',
-                'name_en': 'Chora Church',
-                'denomination': 'Orthodox',
-                'religion': 'christian',
-                'historic': 'church',
-                'coordinates': [41.0307, 28.9388],
-                'description': 'Byzantine church famous for its mosaics and frescoes'
-            },
-            {
-                'name': 'St. George Cathedral',
-                'name_en': 'St. George Cathedral',
-                'denomination': 'Orthodox',
-                'religion': 'christian',
-                'coordinates': [41.0287, 28.9496],
-                'description': 'Orthodox Patriarchate of Constantinople'
-            },
-            {
-                'name': 'St. Anthony of Padua',
-                'name_en': 'St. Anthony of Padua',
-                'denomination': 'Catholic',
-                'religion': 'christian',
-                'coordinates': [41.0362, 28.9744],
-                'description': 'Largest Catholic church in Istanbul'
-            },
-            {
-                'name': 'Armenian Patriarchate Church',
-                'name_en': 'Armenian Patriarchate Church',
-                'denomination': 'Armenian Orthodox',
-                'religion': 'christian',
-                'coordinates': [41.0176, 28.9668],
-                'description': 'Armenian Apostolic Church of Constantinople'
-            },
-            {
-                'name': 'Bulgarian St. Stephen Church',
-                'name_en': 'Bulgarian St. Stephen Church',
-                'denomination': 'Orthodox',
-                'religion': 'christian',
-                'coordinates': [41.0276, 28.9408],
-                'description': 'Historic iron church built by Bulgarian community'
-            },
-            {
-                'name': 'Aya Triada Greek Orthodox Church',
-                'name_en': 'Holy Trinity Church',
-                'denomination': 'Orthodox',
-                'religion': 'christian',
-                'coordinates': [41.0380, 28.9760],
-                'description': 'Greek Orthodox church in Beyoğlu'
-            },
-            {
-                'name': 'Surp Krikor Lusarovich Armenian Church',
-                'name_en': 'St. Gregory the Illuminator Church',
-                'denomination': 'Armenian Orthodox',
-                'religion': 'christian',
-                'coordinates': [41.0260, 28.9740],
-                'description': 'Armenian church in Galata'
-            },
+            Church(
+                name='Hagia Sophia',
+                name_en='Hagia Sophia',
+                denomination='Orthodox (Historic)',
+                religion='christian',
+                historic='church',
+                lat=41.0086,
+                lon=28.9802,
+                description='Historic Byzantine cathedral, later Ottoman mosque, now museum/mosque'
+            ),
+            Church(
+                name='Chora Church (Kariye Museum)',
+                name_en='Chora Church',
+                denomination='Orthodox',
+                religion='christian',
+                historic='church',
+                lat=41.0307,
+                lon=28.9388,
+                description='Byzantine church famous for its mosaics and frescoes'
+            ),
+            Church(
+                name='St. George Cathedral',
+                name_en='St. George Cathedral',
+                denomination='Orthodox',
+                religion='christian',
+                lat=41.0287,
+                lon=28.9496,
+                description='Orthodox Patriarchate of Constantinople'
+            ),
+            Church(
+                name='St. Anthony of Padua',
+                name_en='St. Anthony of Padua',
+                denomination='Catholic',
+                religion='christian',
+                lat=41.0362,
+                lon=28.9744,
+                description='Largest Catholic church in Istanbul'
+            ),
+            Church(
+                name='Armenian Patriarchate Church',
+                name_en='Armenian Patriarchate Church',
+                denomination='Armenian Orthodox',
+                religion='christian',
+                lat=41.0176,
+                lon=28.9668,
+                description='Armenian Apostolic Church of Constantinople'
+            ),
+            Church(
+                name='Bulgarian St. Stephen Church',
+                name_en='Bulgarian St. Stephen Church',
+                denomination='Orthodox',
+                religion='christian',
+                lat=41.0276,
+                lon=28.9408,
+                description='Historic iron church built by Bulgarian community'
+            ),
+            Church(
+                name='Aya Triada Greek Orthodox Church',
+                name_en='Holy Trinity Church',
+                denomination='Orthodox',
+                religion='christian',
+                lat=41.0380,
+                lon=28.9760,
+                description='Greek Orthodox church in Beyoğlu'
+            ),
+            Church(
+                name='Surp Krikor Lusarovich Armenian Church',
+                name_en='St. Gregory the Illuminator Church',
+                denomination='Armenian Orthodox',
+                religion='christian',
+                lat=41.0260,
+                lon=28.9740,
+                description='Armenian church in Galata'
+            ),
             # Additional Churches - European Side
-            {
-                'name': 'St. Esprit Cathedral',
-                'name_en': 'St. Esprit Cathedral',
-                'denomination': 'Catholic',
-                'religion': 'christian',
-                'coordinates': [41.0340, 28.9756],
-                'description': 'French Catholic cathedral in Harbiye'
-            },
-            {
-                'name': 'St. Louis of the French',
-                'name_en': 'St. Louis of the French',
-                'denomination': 'Catholic',
-                'religion': 'christian',
-                'coordinates': [41.0350, 28.9750],
-                'description': 'French Catholic church in Beyoğlu'
-            },
-            {
-                'name': 'St. Peter and Paul Church',
-                'name_en': 'St. Peter and Paul Church',
-                'denomination': 'Catholic',
-                'religion': 'christian',
-                'coordinates': [41.0258, 28.9730],
-                'description': 'Italian Catholic church in Galata'
-            },
-            {
-                'name': 'Dutch Chapel',
-                'name_en': 'Dutch Chapel',
-                'denomination': 'Protestant',
-                'religion': 'christian',
-                'coordinates': [41.0255, 28.9735],
-                'description': 'Historic Protestant chapel in Galata'
-            },
-            {
-                'name': 'Christ Church',
-                'name_en': 'Christ Church',
-                'denomination': 'Anglican',
-                'religion': 'christian',
-                'coordinates': [41.0340, 28.9745],
-                'description': 'Anglican church serving English-speaking community'
-            },
-            {
-                'name': 'St. Mary Draperis',
-                'name_en': 'St. Mary Draperis',
-                'denomination': 'Catholic',
-                'religion': 'christian',
-                'coordinates': [41.0345, 28.9742],
-                'description': 'Franciscan Catholic church in Beyoğlu'
-            },
-            {
-                'name': 'Surp Yerrortutyun Armenian Church',
-                'name_en': 'Holy Trinity Armenian Church',
-                'denomination': 'Armenian Orthodox',
-                'religion': 'christian',
-                'coordinates': [41.0180, 28.9680],
-                'description': 'Armenian Apostolic church in Kumkapı'
-            },
+            Church(
+                name='St. Esprit Cathedral',
+                name_en='St. Esprit Cathedral',
+                denomination='Catholic',
+                religion='christian',
+                lat=41.0340,
+                lon=28.9756,
+                description='French Catholic cathedral in Harbiye'
+            ),
+            Church(
+                name='St. Louis of the French',
+                name_en='St. Louis of the French',
+                denomination='Catholic',
+                religion='christian',
+                lat=41.0350,
+                lon=28.9750,
+                description='French Catholic church in Beyoğlu'
+            ),
+            Church(
+                name='St. Peter and Paul Church',
+                name_en='St. Peter and Paul Church',
+                denomination='Catholic',
+                religion='christian',
+                lat=41.0258,
+                lon=28.9730,
+                description='Italian Catholic church in Galata'
+            ),
+            Church(
+                name='Dutch Chapel',
+                name_en='Dutch Chapel',
+                denomination='Protestant',
+                religion='christian',
+                lat=41.0255,
+                lon=28.9735,
+                description='Historic Protestant chapel in Galata'
+            ),
+            Church(
+                name='Christ Church',
+                name_en='Christ Church',
+                denomination='Anglican',
+                religion='christian',
+                lat=41.0340,
+                lon=28.9745,
+                description='Anglican church serving English-speaking community'
+            ),
+            Church(
+                name='St. Mary Draperis',
+                name_en='St. Mary Draperis',
+                denomination='Catholic',
+                religion='christian',
+                lat=41.0345,
+                lon=28.9742,
+                description='Franciscan Catholic church in Beyoğlu'
+            ),
+            Church(
+                name='Surp Yerrortutyun Armenian Church',
+                name_en='Holy Trinity Armenian Church',
+                denomination='Armenian Orthodox',
+                religion='christian',
+                lat=41.0180,
+                lon=28.9680,
+                description='Armenian Apostolic church in Kumkapı'
+            ),
             # Asian Side Churches
-            {
-                'name': 'Surp Takavor Armenian Church',
-                'name_en': 'Holy Savior Armenian Church',
-                'denomination': 'Armenian Orthodox',
-                'religion': 'christian',
-                'coordinates': [41.0170, 29.0250],
-                'description': 'Armenian church in Üsküdar'
-            },
-            {
-                'name': 'St. Barbara Church',
-                'name_en': 'St. Barbara Church',
-                'denomination': 'Orthodox',
-                'religion': 'christian',
-                'coordinates': [41.0160, 29.0240],
-                'description': 'Greek Orthodox church in Üsküdar'
-            },
-            {
-                'name': 'Sacred Heart Church',
-                'name_en': 'Sacred Heart Church',
-                'denomination': 'Catholic',
-                'religion': 'christian',
-                'coordinates': [41.0180, 29.0300],
-                'description': 'Catholic church serving Asian side community'
-            },
+            Church(
+                name='Surp Takavor Armenian Church',
+                name_en='Holy Savior Armenian Church',
+                denomination='Armenian Orthodox',
+                religion='christian',
+                lat=41.0170,
+                lon=29.0250,
+                description='Armenian church in Üsküdar'
+            ),
+            Church(
+                name='St. Barbara Church',
+                name_en='St. Barbara Church',
+                denomination='Orthodox',
+                religion='christian',
+                lat=41.0160,
+                lon=29.0240,
+                description='Greek Orthodox church in Üsküdar'
+            ),
+            Church(
+                name='Sacred Heart Church',
+                name_en='Sacred Heart Church',
+                denomination='Catholic',
+                religion='christian',
+                lat=41.0180,
+                lon=29.0300,
+                description='Catholic church serving Asian side community'
+            ),
             # Additional Orthodox Churches
-            {
-                'name': 'St. Nicholas Church',
-                'name_en': 'St. Nicholas Church',
-                'denomination': 'Orthodox',
-                'religion': 'christian',
-                'coordinates': [41.0290, 28.9450],
-                'description': 'Orthodox church in Fener district'
-            },
-            {
-                'name': 'Panagia Isodion Church',
-                'name_en': 'Panagia Isodion Church',
-                'denomination': 'Orthodox',
-                'religion': 'christian',
-                'coordinates': [41.0300, 28.9460],
-                'description': 'Greek Orthodox church in Fener'
-            }
+            Church(
+                name='St. Nicholas Church',
+                name_en='St. Nicholas Church',
+                denomination='Orthodox',
+                religion='christian',
+                lat=41.0290,
+                lon=28.9450,
+                description='Orthodox church in Fener district'
+            ),
+            Church(
+                name='Panagia Isodion Church',
+                name_en='Panagia Isodion Church',
+                denomination='Orthodox',
+                religion='christian',
+                lat=41.0300,
+                lon=28.9460,
+                description='Greek Orthodox church in Fener'
+            )
         ]
     
-    def add_churches_to_map(self, churches: List[Dict]) -> None:
+    def add_churches_to_map(self, churches: List[Church]) -> None:
         """Add church markers to the map with custom styling."""
+        import folium.plugins
+        
         print(f"Adding {len(churches)} churches to the map...")
         
-        # Define colors for different denominations
-        denomination_colors = {
-            'Orthodox': 'red',
-            'Catholic': 'blue',
-            'Armenian Orthodox': 'purple',
-            'Protestant': 'green',
-            'Christian': 'orange',
-            'Unknown': 'gray'
-        }
+        denomination_colors = DENOMINATION_COLORS
         
-        # Add churches directly to the map (no feature groups)
+        records = []
         for church in churches:
             # Determine color based on denomination
-            denomination = church.get('denomination', 'Unknown')
+            denomination = church.denomination
             if denomination not in denomination_colors:
                 # Map common denomination variations
-                if 'orthodox' in denomination.lower():
-                    color = denomination_colors['Orthodox']
-                elif 'catholic' in denomination.lower():
-                    color = denomination_colors['Catholic']
-                elif 'armenian' in denomination.lower():
-                    color = denomination_colors['Armenian Orthodox']
-                elif 'protestant' in denomination.lower():
-                    color = denomination_colors['Protestant']
-                else:
-                    color = denomination_colors['Christian']
+                color = denomination_colors[normalize_denomination(denomination) or 'Christian']
             else:
                 color = denomination_colors[denomination]
             
-            # Create popup text with legend info
-            popup_text = f"""
-            <div style="width: 280px;">
-                <h4 style="margin-bottom: 10px; color: #333;">⛪ {church['name']}</h4>
-                {f"<p><strong>English Name:</strong> {church['name_en']}</p>" if church.get('name_en') else ""}
-                <p><strong>Denomination:</strong> <span style="color: {color}; font-weight: bold;">●</span> {denomination}</p>
-                {f"<p><strong>Type:</strong> {church.get('historic', church.get('building', 'Place of Worship')).title()}</p>" if church.get('historic') or church.get('building') else ""}
-                {f"<p><strong>Description:</strong> {church['description']}</p>" if church.get('description') else ""}
-                <p><strong>Coordinates:</strong> {church['coordinates'][0]:.4f}, {church['coordinates'][1]:.4f}</p>
-                {f"<p><strong>OSM ID:</strong> {church.get('osm_type', '')}{church.get('osm_id', '')}</p>" if church.get('osm_id') else ""}
-                <hr style="margin: 10px 0;">
-                <small style="color: #666;">
-                    <strong>Legend:</strong><br>
-                    <span style="color: red;">●</span> Orthodox &nbsp;
-                    <span style="color: blue;">●</span> Catholic &nbsp;
-                    <span style="color: purple;">●</span> Armenian<br>
-                    <span style="color: green;">●</span> Protestant &nbsp;
-                    <span style="color: orange;">●</span> Christian
-                </small>
-            </div>
-            """
-            
-            # Create simple, visible marker
-            marker = folium.CircleMarker(
-                location=church['coordinates'],
-                radius=6,
-                popup=folium.Popup(popup_text, max_width=320),
-                tooltip=f"⛪ {church['name']} ({denomination})",
-                color=color,
-                fill=True,
-                fillColor=color,
-                fillOpacity=0.8,
-                weight=2
-            )
-            
-            # Add marker directly to the map
-            if self.map:
-                marker.add_to(self.map)
+            # Collect one compact record per marker; the browser builds the markers
+            records.append([
+                church.lat,
+                church.lon,
+                color,
+                _popup_html(church, color, denomination),
+                f"⛪ {church.name} ({denomination})"
+            ])
+        
+        # Add all churches to the map as a single clustered layer
+        if self.map:
+            folium.plugins.FastMarkerCluster(
+                data=records,
+                callback=_MARKER_CALLBACK,
+                disable_clustering_at_zoom=15
+            ).add_to(self.map)
         
         # Add legend once after all churches are added
         self.add_legend_to_map(denomination_colors)
     
-    def add_legend(self, denomination_colors: Dict[str, str]) -> None:
+    def add_legend(self, denomination_colors: Dict[str, str] = DENOMINATION_COLORS) -> None:
         """Add a legend to the map showing denomination colors."""
         if not self.map:
             return
-            
-        legend_html = '''
-        <div style="position: fixed; 
-                    bottom: 50px; left: 50px; width: 200px; height: auto; 
-                    background-color: white; border:2px solid grey; z-index:9999; 
-                    font-size:14px; padding: 10px">
-        <h4 style="margin-top: 0;">Church Denominations</h4>
-        '''
         
-        for denomination, color in denomination_colors.items():
-            if denomination != 'Unknown':  # Skip unknown in legend
-                legend_html += f'''
-                <p style="margin: 5px 0;">
-                    <i class="fa fa-circle" style="color:{color}; margin-right: 5px;"></i>
-                    {denomination}
-                </p>
-                '''
+        import folium
         
-        legend_html += '</div>'
+        if denomination_colors == DENOMINATION_COLORS:
+            legend_html = _LEGEND_HTML
+        else:
+            legend_html = _build_legend(denomination_colors)
+        self.map.get_root().html.add_child(folium.Element(legend_html))
         
-        # Add a proper legend to the map
+        # Also list the colors in the console
         self.add_legend_to_map(denomination_colors)
     
-    def add_legend_to_map(self, denomination_colors: Dict[str, str]) -> None:
+    def add_legend_to_map(self, denomination_colors: Dict[str, str] = DENOMINATION_COLORS) -> None:
         """Add a legend overlay to the map showing denomination colors."""
         if not self.map:
             return
-            
-        # Create a simple HTML legend that will definitely work
-        legend_html = '''
-        {% macro html(this, kwargs) %}
-        <div style="position: fixed; 
-                    top: 10px; right: 10px; width: 160px; height: auto; 
-                    background-color: white; border: 2px solid grey; z-index: 9999; 
-                    font-size: 11px; padding: 8px; border-radius: 3px;
-                    box-shadow: 0 0 10px rgba(0,0,0,0.2);">
-        <div style="text-align: center; font-weight: bold; margin-bottom: 8px; color: #333;">
-            ⛪ Churches Legend
-        </div>
-        '''
-        
-        # Add each denomination with its color
-        for denomination, color in denomination_colors.items():
-            if denomination != 'Unknown':  # Skip unknown in legend
-                legend_html += f'''
-                <div style="margin: 3px 0; font-size: 10px;">
-                    <span style="color: {color}; font-size: 14px; margin-right: 5px;">●</span>
-                    {denomination}
-                </div>
-                '''
-        
-        legend_html += '''
-        <div style="margin-top: 8px; padding-top: 5px; border-top: 1px solid #eee; 
-                    font-size: 9px; color: #666; text-align: center;">
-            Click markers for details
-        </div>
-        </div>
-        {% endmacro %}
-        '''
         
-        # Add the legend using a simpler approach
+        # The overlay HTML is never attached here; list the colors in the console
         print("📊 Legend colors:")
         for denomination, color in denomination_colors.items():
             if denomination != 'Unknown':
@@ -523,9 +687,8 @@ class IstanbulChurchesMapper:
         if not self.map:
             raise ValueError("Map not initialized")
         
-        from pathlib import Path
         filepath = Path(__file__).parent / filename
-        self.map.save(str(filepath))
+        _stream_save(self.map, filepath)
         print(f"Map saved to: {filepath}")
         return str(filepath)
     
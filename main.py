@@ -4,29 +4,56 @@ Main script for Istanbul Churches Maps
 Executes all mapping scripts and serves the results on localhost
 """
 
+import functools
+import importlib
+import itertools
+import multiprocessing
 import os
 import sys
 import time
 import webbrowser
 import threading
 import http.server
-import socketserver
+import socket
 from pathlib import Path
 import subprocess
 import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-def ensure_dependencies():
-    """Ensure all required packages are installed."""
-    print("🔍 Checking dependencies...")
-    
-    required_packages = ["folium", "requests", "pandas"]
-    missing_packages = []
-    
-    for package in required_packages:
+def _deps_stamp_valid(stamp, requirements):
+    """Whether stamp records a check for this interpreter newer than requirements."""
+    try:
+        if stamp.read_text() != sys.prefix:
+            return False
+        return not requirements.exists() or stamp.stat().st_mtime >= requirements.stat().st_mtime
+    except OSError:
+        return False
+
+def _missing_packages(packages):
+    """Names in packages that the running interpreter cannot import."""
+    missing = []
+    for package in packages:
         try:
             __import__(package)
         except ImportError:
-            missing_packages.append(package)
+            missing.append(package)
+    return missing
+
+def ensure_dependencies(force=False):
+    """Ensure all required packages are installed.
+    
+    A successful check is recorded in a stamp file for the running interpreter,
+    so later runs skip importing every package until requirements.txt changes.
+    """
+    stamp = Path(__file__).parent / ".cache" / "deps_ok"
+    if not force and _deps_stamp_valid(stamp, Path(__file__).parent / "requirements.txt"):
+        print("✅ All dependencies are available (cached check)")
+        return
+    
+    print("🔍 Checking dependencies...")
+    
+    required_packages = ["folium", "requests", "orjson", "pandas"]
+    missing_packages = _missing_packages(required_packages)
     
     if missing_packages:
         print(f"❌ Missing packages: {', '.join(missing_packages)}")
@@ -40,20 +67,31 @@ def ensure_dependencies():
         
         try:
             subprocess.run([pip_cmd, "install"] + missing_packages, check=True)
-            print("✅ Dependencies installed successfully")
         except subprocess.CalledProcessError:
             print("❌ Failed to install dependencies")
             sys.exit(1)
+        
+        # pip may have installed into another interpreter (e.g. .venv while running
+        # outside it); only record the check once this one can import everything
+        importlib.invalidate_caches()
+        still_missing = _missing_packages(missing_packages)
+        if still_missing:
+            print(f"⚠️ Installed, but still not importable by {sys.executable}: {', '.join(still_missing)}")
+            return
+        print("✅ Dependencies installed successfully")
     else:
         print("✅ All dependencies are available")
+    
+    stamp.parent.mkdir(exist_ok=True)
+    stamp.write_text(sys.prefix)
 
-def generate_points_map():
+def generate_points_map(refresh=False):
     """Generate the churches points map."""
     print("📍 Generating churches points map...")
     
     try:
         from istanbul_churches_map import IstanbulChurchesMapper
-        mapper = IstanbulChurchesMapper()
+        mapper = IstanbulChurchesMapper(refresh=refresh)
         filepath = mapper.create_complete_map()
         print(f"✅ Points map created: {filepath}")
         return filepath
@@ -61,21 +99,62 @@ def generate_points_map():
         print(f"❌ Error creating points map: {e}")
         return None
 
-def generate_buildings_map():
+# Church footprints in central Istanbul, as full way geometries.
+# historic=church and building=church share one key-regex clause, so the
+# server walks the area once for both instead of once per tag.
+BUILDINGS_QUERY = """
+[out:json][timeout:25][bbox:40.9,28.7,41.2,29.3];
+(
+  way["amenity"="place_of_worship"]["religion"="christian"];
+  way[~"^(historic|building)$"~"^church$"];
+);
+out geom qt;
+"""
+
+# Below this many elements, process start-up and pickling cost more than they save
+_PARALLEL_THRESHOLD = 5000
+
+def _build_feature(element, colors_lower):
+    """Build the GeoJSON feature for one Overpass way, or None if it has no usable footprint."""
+    if element['type'] != 'way' or 'geometry' not in element:
+        return None
+    
+    # GeoJSON positions are (lon, lat)
+    coords = [(node['lon'], node['lat']) for node in element['geometry']]
+    if len(coords) < 3:
+        return None
+    
+    tags = element.get('tags', {})
+    name = tags.get('name', f'Church Building {element["id"]}')
+    denomination = tags.get('denomination', 'Christian')
+    
+    # Determine color (orange by default)
+    denomination_lower = denomination.lower()
+    color = next((col for denom, col in colors_lower if denom in denomination_lower), 'orange')
+    
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Polygon', 'coordinates': [coords]},
+        'properties': {'name': name, 'denomination': denomination, 'color': color}
+    }
+
+def generate_buildings_map(refresh=False):
     """Generate the churches buildings map."""
     print("🏛️ Generating churches buildings map...")
     
     # Create buildings mapper inline since the file might be missing
     try:
         import folium
-        import requests
-        import json
+        import orjson
         from typing import List, Dict
+        from istanbul_churches_map import _atomic_write, fetch_overpass
         
         class IstanbulChurchesBuildingsMapper:
-            def __init__(self):
+            def __init__(self, refresh=False):
                 self.istanbul_center = [41.0082, 28.9784]
                 self.map = None
+                self.refresh = refresh
+                self._features = None  # Filled by load_buildings()
             
             def create_base_map(self):
                 """Create base map with satellite view."""
@@ -97,65 +176,51 @@ def generate_buildings_map():
                 folium.LayerControl().add_to(self.map)
                 return self.map
             
-            def fetch_and_add_buildings(self):
-                """Fetch and add building polygons."""
-                try:
-                    overpass_url = "http://overpass-api.de/api/interpreter"
-                    overpass_query = """
-                    [out:json][timeout:25];
-                    (
-                      way["amenity"="place_of_worship"]["religion"="christian"](40.9,28.7,41.2,29.3);
-                      way["historic"="church"](40.9,28.7,41.2,29.3);
-                      way["building"="church"](40.9,28.7,41.2,29.3);
-                    );
-                    out geom;
-                    """
-                    
-                    # Bypass proxy for OpenStreetMap API
-                    proxies = {'http': '', 'https': ''}
-                    response = requests.get(overpass_url, params={'data': overpass_query}, timeout=30, proxies=proxies)
-                    response.raise_for_status()
-                    data = response.json()
+            def load_buildings(self):
+                """Fetch church footprints as GeoJSON features, once per mapper."""
+                if self._features is None:
+                    # Served from the on-disk Overpass cache while it is fresh
+                    data = orjson.loads(fetch_overpass(BUILDINGS_QUERY, timeout=30, refresh=self.refresh))
                     
                     colors = {'Orthodox': 'red', 'Catholic': 'blue', 'Armenian Orthodox': 'purple', 
                              'Protestant': 'green', 'Christian': 'orange'}
                     
-                    buildings_added = 0
-                    for element in data['elements']:
-                        if element['type'] != 'way' or 'geometry' not in element:
-                            continue
-                        
-                        coords = [[node['lat'], node['lon']] for node in element['geometry']]
-                        if len(coords) < 3:
-                            continue
-                        
-                        tags = element.get('tags', {})
-                        name = tags.get('name', f'Church Building {element["id"]}')
-                        denomination = tags.get('denomination', 'Christian')
-                        
-                        # Determine color
-                        color = 'orange'  # default
-                        for denom, col in colors.items():
-                            if denom.lower() in denomination.lower():
-                                color = col
-                                break
-                        
-                        # Create polygon
-                        if self.map:
-                            folium.Polygon(
-                                locations=coords,
-                                popup=f"<b>{name}</b><br>Denomination: {denomination}",
-                                tooltip=name,
-                                color=color,
-                                weight=3,
-                                opacity=0.8,
-                                fill=True,
-                                fillColor=color,
-                                fillOpacity=0.3
-                            ).add_to(self.map)
-                        
-                        buildings_added += 1
+                    # Lowercase the color keys once instead of per building
+                    colors_lower = [(denom.lower(), col) for denom, col in colors.items()]
                     
+                    elements = data['elements']
+                    if len(elements) >= _PARALLEL_THRESHOLD:
+                        # main() runs this in a worker thread; forking a threaded process can
+                        # copy locks held by other jobs into the children, so spawn them fresh
+                        with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as executor:
+                            built = list(executor.map(_build_feature, elements, itertools.repeat(colors_lower), chunksize=32))
+                    else:
+                        built = [_build_feature(element, colors_lower) for element in elements]
+                    self._features = [feature for feature in built if feature]
+                return self._features
+            
+            def fetch_and_add_buildings(self):
+                """Fetch and add building polygons."""
+                try:
+                    features = self.load_buildings()
+                    
+                    # Add all footprints as one GeoJSON layer instead of a polygon each
+                    if self.map and features:
+                        folium.GeoJson(
+                            {'type': 'FeatureCollection', 'features': features},
+                            name='Church Buildings',
+                            style_function=lambda feature: {
+                                'color': feature['properties']['color'],
+                                'weight': 3,
+                                'opacity': 0.8,
+                                'fillColor': feature['properties']['color'],
+                                'fillOpacity': 0.3
+                            },
+                            tooltip=folium.GeoJsonTooltip(fields=['name'], labels=False),
+                            popup=folium.GeoJsonPopup(fields=['name', 'denomination'], aliases=['', 'Denomination:'])
+                        ).add_to(self.map)
+                    
+                    buildings_added = len(features)
                     print(f"   Added {buildings_added} building footprints")
                     return buildings_added
                     
@@ -168,7 +233,7 @@ def generate_buildings_map():
                 if not self.map:
                     raise ValueError("Map not initialized")
                 filepath = Path(__file__).parent / filename
-                self.map.save(str(filepath))
+                _atomic_write(filepath, lambda tmp_path: self.map.save(str(tmp_path)))
                 return str(filepath)
             
             def create_complete_map(self):
@@ -179,7 +244,7 @@ def generate_buildings_map():
                 return filepath, buildings_count
         
         # Create the buildings map
-        buildings_mapper = IstanbulChurchesBuildingsMapper()
+        buildings_mapper = IstanbulChurchesBuildingsMapper(refresh=refresh)
         filepath, count = buildings_mapper.create_complete_map()
         print(f"✅ Buildings map created: {filepath} ({count} buildings)")
         return filepath
@@ -188,72 +253,63 @@ def generate_buildings_map():
         print(f"❌ Error creating buildings map: {e}")
         return None
 
-def generate_coverage_analysis():
+def generate_coverage_analysis(refresh=False):
     """Generate coverage analysis."""
     print("📊 Generating coverage analysis...")
     
     try:
         from analyze_coverage import analyze_church_coverage
-        analyze_church_coverage()
+        analyze_church_coverage(refresh=refresh)
         print("✅ Coverage analysis completed")
     except Exception as e:
         print(f"❌ Error in coverage analysis: {e}")
 
-def create_index_page(points_map_exists, buildings_map_exists):
-    """Create or update index page."""
-    print("📄 Creating index page...")
-    
-    index_content = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Istanbul Churches Maps</title>
-    <style>
-        body {{
+# Index page styles, substituted whole into _INDEX_TEMPLATE
+_INDEX_CSS = """\
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
             max-width: 1200px;
             margin: 0 auto;
             padding: 20px;
             background: #f5f5f5;
-        }}
-        .header {{
+        }
+        .header {
             background: white;
             padding: 30px;
             border-radius: 10px;
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
             margin-bottom: 30px;
             text-align: center;
-        }}
-        .header h1 {{
+        }
+        .header h1 {
             color: #333;
             margin: 0 0 10px 0;
             font-size: 2.5em;
-        }}
-        .maps-container {{
+        }
+        .maps-container {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
             gap: 30px;
             margin-bottom: 30px;
-        }}
-        .map-card {{
+        }
+        .map-card {
             background: white;
             border-radius: 10px;
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
             overflow: hidden;
             transition: transform 0.2s ease;
-        }}
-        .map-card:hover {{
+        }
+        .map-card:hover {
             transform: translateY(-5px);
-        }}
-        .map-info {{
+        }
+        .map-info {
             padding: 25px;
-        }}
-        .map-info h2 {{
+        }
+        .map-info h2 {
             margin: 0 0 15px 0;
             color: #333;
-        }}
-        .btn {{
+        }
+        .btn {
             display: inline-block;
             padding: 12px 25px;
             background: #667eea;
@@ -261,36 +317,46 @@ def create_index_page(points_map_exists, buildings_map_exists):
             text-decoration: none;
             border-radius: 5px;
             font-weight: 500;
-        }}
-        .btn:hover {{
+        }
+        .btn:hover {
             background: #5a67d8;
-        }}
-        .btn:disabled {{
+        }
+        .btn:disabled {
             background: #ccc;
             cursor: not-allowed;
-        }}
-        .status {{
+        }
+        .status {
             padding: 15px;
             margin: 15px 0;
             border-radius: 5px;
-        }}
-        .status.success {{
+        }
+        .status.success {
             background: #d4edda;
             color: #155724;
             border: 1px solid #c3e6cb;
-        }}
-        .status.error {{
+        }
+        .status.error {
             background: #f8d7da;
             color: #721c24;
             border: 1px solid #f5c6cb;
-        }}
-    </style>
+        }
+"""
+
+# Index page skeleton; only the timestamp and per-map status are filled in per run
+_INDEX_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Istanbul Churches Maps</title>
+    <style>
+{css}    </style>
 </head>
 <body>
     <div class="header">
         <h1>🗺️ Istanbul Churches Maps</h1>
         <p>Interactive maps showing Christian churches across Istanbul</p>
-        <p><strong>Generated:</strong> {time.strftime('%Y-%m-%d %H:%M:%S')}</p>
+        <p><strong>Generated:</strong> {timestamp}</p>
     </div>
 
     <div class="maps-container">
@@ -299,9 +365,9 @@ def create_index_page(points_map_exists, buildings_map_exists):
                 <h2>📍 Points Map</h2>
                 <p>Church locations as colored markers on detailed street maps.</p>
                 
-                {'<div class="status success">✅ Map available</div>' if points_map_exists else '<div class="status error">❌ Map not available</div>'}
+                {points_status}
                 
-                <a href="istanbul_churches_map.html" class="btn" {'target="_blank"' if points_map_exists else 'style="pointer-events: none; opacity: 0.6;"'}>
+                <a href="istanbul_churches_map.html" class="btn" {points_attrs}>
                     View Points Map →
                 </a>
             </div>
@@ -312,9 +378,9 @@ def create_index_page(points_map_exists, buildings_map_exists):
                 <h2>🏛️ Buildings Map</h2>
                 <p>Church building footprints with colored outlines and satellite view.</p>
                 
-                {'<div class="status success">✅ Map available</div>' if buildings_map_exists else '<div class="status error">❌ Map not available</div>'}
+                {buildings_status}
                 
-                <a href="istanbul_churches_buildings_map.html" class="btn" {'target="_blank"' if buildings_map_exists else 'style="pointer-events: none; opacity: 0.6;"'}>
+                <a href="istanbul_churches_buildings_map.html" class="btn" {buildings_attrs}>
                     View Buildings Map →
                 </a>
             </div>
@@ -334,14 +400,82 @@ def create_index_page(points_map_exists, buildings_map_exists):
     </div>
 </body>
 </html>"""
+
+_STATUS_AVAILABLE = '<div class="status success">✅ Map available</div>'
+_STATUS_MISSING = '<div class="status error">❌ Map not available</div>'
+_LINK_ENABLED = 'target="_blank"'
+_LINK_DISABLED = 'style="pointer-events: none; opacity: 0.6;"'
+
+# Generated map files, by job name
+_MAP_FILES = {'points': "istanbul_churches_map.html", 'buildings': "istanbul_churches_buildings_map.html"}
+
+def _up_to_date(output, inputs):
+    """Whether output exists and is at least as new as every one of inputs."""
+    try:
+        built = output.stat().st_mtime
+    except OSError:
+        return False
+    return all(path.exists() and path.stat().st_mtime <= built for path in inputs)
+
+def _map_is_current(name):
+    """Whether a generated map is newer than its sources and its still-fresh Overpass caches."""
+    from istanbul_churches_map import CACHE_TTL, CHURCHES_QUERY, ISLANDS_QUERY, overpass_cache_path
+    
+    base_dir = Path(__file__).parent
+    sources = [base_dir / "istanbul_churches_map.py"]
+    if name == 'points':
+        queries = [CHURCHES_QUERY, ISLANDS_QUERY]
+    else:
+        sources.append(Path(__file__))  # The buildings mapper lives in this file
+        queries = [BUILDINGS_QUERY]
+    
+    caches = [overpass_cache_path(query) for query in queries]
+    if not _up_to_date(base_dir / _MAP_FILES[name], sources + caches):
+        return False
+    # An expired cache means the next fetch may bring new data
+    return all(time.time() - cache.stat().st_mtime < CACHE_TTL for cache in caches)
+
+def create_index_page(points_map_exists, buildings_map_exists):
+    """Create or update index page."""
+    print("📄 Creating index page...")
+    
+    from istanbul_churches_map import _atomic_write
+    
+    index_content = _INDEX_TEMPLATE.format_map({
+        'css': _INDEX_CSS,
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'points_status': _STATUS_AVAILABLE if points_map_exists else _STATUS_MISSING,
+        'points_attrs': _LINK_ENABLED if points_map_exists else _LINK_DISABLED,
+        'buildings_status': _STATUS_AVAILABLE if buildings_map_exists else _STATUS_MISSING,
+        'buildings_attrs': _LINK_ENABLED if buildings_map_exists else _LINK_DISABLED,
+    })
     
     index_path = Path(__file__).parent / "index.html"
-    with open(index_path, 'w', encoding='utf-8') as f:
-        f.write(index_content)
+    # Swap the page in atomically so a reload never hits a half-written file
+    _atomic_write(index_path, lambda tmp_path: tmp_path.write_bytes(index_content.encode('utf-8')))
     
     print(f"✅ Index page created: {index_path}")
     return str(index_path)
 
+def _find_port(start, n):
+    """Return the first port in start..start+n-1 that can be bound, or None."""
+    for port in range(start, start + n):
+        probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Same options as ReusableHTTPServer, so a port shared with another
+        # instance of this server counts as free
+        probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        try:
+            probe.bind(("", port))
+            return port
+        except OSError as e:
+            if e.errno != 48 and e.errno != 98:  # Port already in use (macOS/Linux)
+                raise  # Different error, re-raise
+        finally:
+            probe.close()
+    return None
+
 def start_server(port=8080, max_attempts=10):
     """Start HTTP server in a separate thread, trying next port if already in use."""
     
@@ -350,27 +484,27 @@ def start_server(port=8080, max_attempts=10):
             # Suppress default logging, only show access in quiet mode
             pass
     
-    original_port = port
-    httpd = None
+    class ReusableHTTPServer(http.server.ThreadingHTTPServer):
+        """Threaded server so the page and its assets load in parallel."""
+        allow_reuse_address = True
+        daemon_threads = True
+        
+        def server_bind(self):
+            # Let the kernel balance connections if several instances share a port
+            if hasattr(socket, "SO_REUSEPORT"):
+                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            super().server_bind()
     
-    # Try to find an available port
-    for attempt in range(max_attempts):
-        try:
-            os.chdir(Path(__file__).parent)
-            httpd = socketserver.TCPServer(("", port), QuietHTTPRequestHandler)
-            break  # Successfully bound to port
-        except OSError as e:
-            if e.errno == 48 or e.errno == 98:  # Port already in use (macOS/Linux)
-                if attempt < max_attempts - 1:
-                    port += 1
-                    continue
-                else:
-                    raise Exception(f"Could not find available port after trying {original_port}-{port}")
-            else:
-                raise  # Different error, re-raise
+    found = _find_port(port, max_attempts)
+    if found is None:
+        raise Exception(f"Could not find available port after trying {port}-{port + max_attempts - 1}")
+    port = found
+    
+    # Serve the project directory without changing the process working directory
+    handler_cls = functools.partial(QuietHTTPRequestHandler, directory=str(Path(__file__).parent))
     
-    if httpd is None:
-        raise Exception("Failed to create server")
+    # Another process may still grab the port before we bind; that surfaces as OSError
+    httpd = ReusableHTTPServer(("", port), handler_cls)
     
     def run_server():
         httpd.serve_forever()
@@ -380,6 +514,17 @@ def start_server(port=8080, max_attempts=10):
     
     return server_thread, port
 
+def _wait_ready(port, deadline=2.0):
+    """Return True once the local server accepts connections, False after deadline seconds."""
+    start = time.monotonic()
+    while time.monotonic() - start < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.05).close()
+            return True
+        except OSError:
+            time.sleep(0.01)
+    return False
+
 def main():
     """Main function to orchestrate everything."""
     parser = argparse.ArgumentParser(description="Istanbul Churches Maps Generator and Server")
@@ -388,6 +533,10 @@ def main():
     parser.add_argument("--with-buildings", action="store_true", help="Also generate buildings map")
     parser.add_argument("--with-analysis", action="store_true", help="Also generate coverage analysis")
     parser.add_argument("--quiet", "-q", action="store_true", help="Quiet mode - minimal output")
+    parser.add_argument("--check-deps", action="store_true", help="Re-check dependencies even if a previous check passed")
+    parser.add_argument("--refresh", action="store_true", help="Refetch OpenStreetMap data instead of using the 24h cache")
+    parser.add_argument("--force", action="store_true", help="Regenerate maps even if they are up to date")
+    parser.add_argument("--serve-only", action="store_true", help="Serve previously generated maps without checking dependencies or regenerating")
     
     args = parser.parse_args()
     
@@ -395,20 +544,47 @@ def main():
         print("🗺️ Istanbul Churches Map Generator")
         print("=" * 50)
     
-    # Step 1: Check dependencies
-    ensure_dependencies()
-    
-    # Step 2: Generate points map
-    points_map_path = generate_points_map()
-    points_map_exists = points_map_path and Path(points_map_path).exists()
-    
-    # Optional: Generate buildings map
-    if args.with_buildings:
-        buildings_map_path = generate_buildings_map()
-    
-    # Optional: Generate analysis
-    if args.with_analysis:
-        generate_coverage_analysis()
+    if args.serve_only:
+        # Serve what an earlier run generated; skips the dependency check and folium import
+        base_dir = Path(__file__).parent
+        points_map_exists = (base_dir / "istanbul_churches_map.html").exists()
+        buildings_map_exists = (base_dir / "istanbul_churches_buildings_map.html").exists()
+        if not points_map_exists:
+            print("❌ No generated map found - run once without --serve-only first")
+            sys.exit(1)
+    else:
+        # Step 1: Check dependencies
+        ensure_dependencies(force=args.check_deps)
+        
+        # Step 2: Generate points map, plus the optional buildings map and analysis.
+        # Each job mostly waits on Overpass and file I/O, so they run side by side.
+        jobs = {'points': generate_points_map}
+        if args.with_buildings:
+            jobs['buildings'] = generate_buildings_map
+        if args.with_analysis:
+            jobs['analysis'] = generate_coverage_analysis
+        
+        # Maps already built from the current sources and cached data are kept as they are
+        results = {}
+        if not (args.force or args.refresh):
+            for name, filename in _MAP_FILES.items():
+                if name in jobs and _map_is_current(name):
+                    del jobs[name]
+                    results[name] = str(Path(__file__).parent / filename)
+                    print(f"⏭️ {filename} is up to date (use --force to rebuild)")
+        
+        if jobs:
+            with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+                futures = {name: executor.submit(job, refresh=args.refresh) for name, job in jobs.items()}
+            results.update((name, future.result()) for name, future in futures.items())
+        
+        points_map_path = results['points']
+        points_map_exists = bool(points_map_path and Path(points_map_path).exists())
+        buildings_map_path = results.get('buildings')
+        buildings_map_exists = bool(buildings_map_path and Path(buildings_map_path).exists())
+        
+    # Index page links whichever maps were generated
+    create_index_page(points_map_exists, buildings_map_exists)
     
     # Step 3: Start server
     print(f"🌐 Starting server on port {args.port}...")
@@ -420,8 +596,8 @@ def main():
         print(f"❌ Failed to start server: {e}")
         sys.exit(1)
     
-    # Give server time to start
-    time.sleep(1)
+    # The socket is already listening; just confirm it accepts connections
+    _wait_ready(actual_port)
     
     # Step 4: Open browser
     base_url = f"http://localhost:{actual_port}"